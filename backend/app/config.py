@@ -43,6 +43,22 @@ class Settings(BaseSettings):
     DEFAULT_MODEL_ANALYSIS: str = os.getenv("DEFAULT_MODEL_ANALYSIS", "agent2:latest")
     DEFAULT_MODEL_RECOMMENDATION: str = os.getenv("DEFAULT_MODEL_RECOMMENDATION", "deepseek-r1:latest")
     
+    # How long Ollama keeps a model loaded after a request ("10m", "1h", "-1" for forever, "0" to unload at once)
+    OLLAMA_KEEP_ALIVE: str = os.getenv("OLLAMA_KEEP_ALIVE", "10m")
+    
+    # Evaluations evaluate_chats sends to Ollama at once; match OLLAMA_NUM_PARALLEL on the server
+    EVALUATION_CONCURRENCY: int = int(os.getenv("EVALUATION_CONCURRENCY", "4"))
+    
+    # Number of evaluations kept in memory for identical (model, transcript) pairs; 0 disables
+    EVALUATION_CACHE_SIZE: int = int(os.getenv("EVALUATION_CACHE_SIZE", "256"))
+    
+    # Pipeline results kept in memory for status lookups; the oldest are evicted beyond this
+    RESULTS_CACHE_SIZE: int = int(os.getenv("RESULTS_CACHE_SIZE", "1000"))
+    
+    # LLM response cache (development only): replay identical (model, prompt) pairs from disk
+    LLM_CACHE_ENABLED: bool = os.getenv("AURIS_LLM_CACHE", "0").lower() in ("1", "true")
+    LLM_CACHE_DIR: str = os.getenv("AURIS_LLM_CACHE_DIR", ".cache/ollama")
+    
     class Config:
         env_file = ".env"
         extra = "ignore"  # Ignore extra fields in .env file
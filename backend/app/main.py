@@ -4,6 +4,8 @@ from .routers import auth, chat_logs, models
 from .database import engine
 from .models import Base
 from .config import settings
+from .services.ollama_service import ollama_service
+from .services.evaluation_agent import evaluation_agent
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
@@ -42,6 +44,14 @@ app.include_router(auth.router, prefix="/api")
 app.include_router(chat_logs.router, prefix="/api")
 app.include_router(models.router)
 
+@app.on_event("shutdown")
+async def release_evaluation_models():
+    await evaluation_agent.shutdown()
+
+@app.on_event("shutdown")
+async def close_ollama_client():
+    await ollama_service.aclose()
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to AURIS API", "version": "1.0.0"}
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, BackgroundTasks
 from sqlalchemy.orm import Session
 from typing import List, Dict, Any, Optional
+import asyncio
 import json
 import uuid
 from datetime import datetime
@@ -28,11 +29,12 @@ async def get_model_status(
     Debug endpoint to check Ollama status.
     """
     try:
+        # Health probe, /api/tags and psutil sampling block, so keep them off the event loop
         model_info = {
-            "ollama_running": ollama_service.is_ollama_running(),
-            "available_models": ollama_service.get_available_models(),
-            "current_model": ollama_service.get_current_model(),
-            "system_info": ollama_service.get_system_info()
+            "ollama_running": await asyncio.to_thread(ollama_service.is_ollama_running),
+            "available_models": await asyncio.to_thread(ollama_service.get_available_models),
+            "current_model": await asyncio.to_thread(ollama_service.get_current_model),
+            "system_info": await asyncio.to_thread(ollama_service.get_system_info)
         }
         
         return model_info
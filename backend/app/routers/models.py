@@ -20,7 +20,7 @@ async def get_model_status():
     Get the status of Ollama models and system information
     """
     try:
-        status = ollama_service.get_model_status()
+        status = await asyncio.to_thread(ollama_service.get_model_status)
         
         return {
             "success": True,
@@ -34,8 +34,8 @@ async def get_model_status():
 async def get_models() -> Dict[str, Any]:
     """Get list of available models and current model status"""
     try:
-        available_models = ollama_service.get_available_models()
-        current_model = ollama_service.get_current_model()
+        available_models = await asyncio.to_thread(ollama_service.get_available_models)
+        current_model = await asyncio.to_thread(ollama_service.get_current_model)
         default_model = ollama_service.get_default_model()
         agent_default_models = {
             "analysis": ollama_service.get_agent_default_model("analysis"),
@@ -67,9 +67,11 @@ async def load_model(request: Dict[str, Any]):
         if not model_name:
             raise HTTPException(status_code=400, detail="model_name is required")
         
-        success = ollama_service.load_model(model_name)
+        success = await asyncio.to_thread(ollama_service.load_model, model_name)
         
         if success:
+            # Bring the model into Ollama memory now rather than on the first request
+            await ollama_service.warm_model(model_name)
             return {
                 "success": True,
                 "message": f"Model {model_name} loaded successfully",
@@ -92,7 +94,7 @@ async def unload_model():
     Unload the current model to free memory
     """
     try:
-        success = ollama_service.unload_model()
+        success = await asyncio.to_thread(ollama_service.unload_model)
         
         if success:
             return {
@@ -122,7 +124,7 @@ async def test_model_generation(request: Dict[str, Any]):
         
         if not model_name:
             # Use current model if no specific model provided
-            model_name = ollama_service.get_current_model()
+            model_name = await asyncio.to_thread(ollama_service.get_current_model)
             if not model_name:
                 return {
                     "success": False,
@@ -130,7 +132,7 @@ async def test_model_generation(request: Dict[str, Any]):
                     "data": {"response": "No model loaded"}
                 }
         
-        response = ollama_service.test_generation(model_name, prompt)
+        response = await ollama_service.test_generation(model_name, prompt)
         
         if response.startswith("Error"):
             return {
@@ -149,13 +151,41 @@ async def test_model_generation(request: Dict[str, Any]):
         logger.error(f"Failed to test model generation: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to test model generation: {str(e)}")
 
+@router.post("/test-generation/stream")
+async def stream_model_generation(request: Dict[str, Any]):
+    """
+    Stream model generation from Ollama as plain text, chunk by chunk
+    """
+    try:
+        model_name = request.get("model_name")
+        prompt = request.get("prompt", "Hello, how are you today?")
+        
+        if not model_name:
+            # Use current model if no specific model provided
+            model_name = await asyncio.to_thread(ollama_service.get_current_model)
+            if not model_name:
+                return {
+                    "success": False,
+                    "message": "No model loaded. Please load a model first.",
+                    "data": {"response": "No model loaded"}
+                }
+        
+        return StreamingResponse(
+            ollama_service.generate_stream(model_name, prompt),
+            media_type="text/plain"
+        )
+        
+    except Exception as e:
+        logger.error(f"Failed to stream model generation: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to stream model generation: {str(e)}")
+
 @router.get("/system-info")
 async def get_system_info():
     """
     Get system information (CPU, GPU, memory)
     """
     try:
-        system_info = ollama_service.get_system_info()
+        system_info = await asyncio.to_thread(ollama_service.get_system_info)
         
         return {
             "success": True,
@@ -171,7 +201,7 @@ async def get_available_models():
     Get list of available models from Ollama
     """
     try:
-        models = ollama_service.get_available_models()
+        models = await asyncio.to_thread(ollama_service.get_available_models)
         
         return {
             "success": True,
@@ -194,7 +224,7 @@ async def pull_model(request: Dict[str, Any]):
         if not model_name:
             raise HTTPException(status_code=400, detail="model_name is required")
         
-        success = ollama_service.pull_model(model_name)
+        success = await asyncio.to_thread(ollama_service.pull_model, model_name)
         
         if success:
             return {
@@ -219,7 +249,7 @@ async def check_ollama_health():
     Check if Ollama is running and healthy
     """
     try:
-        is_running = ollama_service.is_ollama_running()
+        is_running = await asyncio.to_thread(ollama_service.is_ollama_running)
         
         return {
             "success": True,
@@ -249,11 +279,11 @@ async def stop_model(request: Dict[str, Any]):
         if not model_name:
             raise HTTPException(status_code=400, detail="model_name is required")
         # Call ollama stop <model>
-        result = subprocess.run(["ollama", "stop", model_name], capture_output=True, text=True)
+        result = await asyncio.to_thread(subprocess.run, ["ollama", "stop", model_name], capture_output=True, text=True)
         if result.returncode == 0:
             # Also clear current_model if it matches
-            if ollama_service.get_current_model() == model_name:
-                ollama_service.unload_model()
+            if await asyncio.to_thread(ollama_service.get_current_model) == model_name:
+                await asyncio.to_thread(ollama_service.unload_model)
             return {"success": True, "message": f"Model {model_name} stopped/unloaded from memory."}
         else:
             return {"success": False, "message": result.stderr or f"Failed to stop model {model_name}"}
@@ -266,7 +296,7 @@ async def set_default_model(model_name: str) -> Dict[str, Any]:
     """Set a model as the default model"""
     try:
         # Check if model exists
-        available_models = ollama_service.get_available_models()
+        available_models = await asyncio.to_thread(ollama_service.get_available_models)
         model_names = [model.get("name", "") for model in available_models]
         
         if model_name not in model_names:
@@ -1,10 +1,12 @@
 import os
+import asyncio
 import logging
 import re
 import ast
-from typing import Dict, Any, List, Optional
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
 from .ollama_service import ollama_service
-import json
+from .json_extract import iter_json_objects, loads
 
 logger = logging.getLogger(__name__)
 if not logger.hasHandlers():
@@ -32,6 +34,47 @@ DEFAULT_GUIDELINES = [
     },
 ]
 
+# Leading ```json / trailing ``` fence around a model response
+_CODE_FENCE_RE = re.compile(r'^\s*```(?:json)?\s*|\s*```\s*$')
+# Trailing comma before a closing brace or bracket, which JSON rejects
+_TRAILING_COMMA_RE = re.compile(r',\s*([}\]])')
+
+ANALYSIS_REQUIRED_KEYS = ("key_issues", "positive_highlights", "guideline_adherence")
+
+ANALYSIS_INSTRUCTION = (
+    "Analyze the customer service conversation and return ONLY valid JSON with these exact keys: "
+    "'key_issues' (list of short strings), 'positive_highlights' (list of short strings), "
+    "and 'guideline_adherence' (list of objects with keys: guideline, status (Passed/Failed), details (1 sentence max)). "
+    "Always include ALL keys, even if empty. Do not include any explanation or text outside the JSON. "
+    "IMPORTANT: Only comment on the AGENT's actions, responses, and behavior. Do NOT describe the customer's problem, the chatlog in general, or restate the customer's issue. "
+)
+
+ANALYSIS_RETRY_INSTRUCTION = (
+    "You must always include at least one key issue or one positive highlight. "
+    "All guidelines must be present in the 'guideline_adherence' list. Do not leave any required field empty."
+)
+
+ANALYSIS_PROMPT_SUFFIX = "\n\n### Output:\n"
+
+@lru_cache(maxsize=32)
+def _build_prompt_prefix(guidelines: Tuple[Tuple[str, str], ...], retry: bool = False) -> str:
+    # Everything up to the conversation is fixed for a given guideline set, so build it once
+    # and keep it byte-identical across calls; Ollama can then reuse the prompt cache for it.
+    instruction = ANALYSIS_INSTRUCTION
+    if retry:
+        instruction += f" {ANALYSIS_RETRY_INSTRUCTION}"
+    guidelines_str = "\n".join(f"- {name}: {description}" for name, description in guidelines)
+    return f"""
+### Instruction:
+{instruction}
+
+### Input:
+Guidelines:
+{guidelines_str}
+
+Conversation:
+"""
+
 def get_default_guidelines() -> List[Dict[str, str]]:
     # In the future, load from config or env if needed
     return DEFAULT_GUIDELINES.copy()
@@ -53,78 +96,61 @@ class AnalysisAgent:
     def get_guidelines(self, override: Optional[List[Dict[str, str]]] = None) -> List[Dict[str, str]]:
         return override if override is not None else get_default_guidelines()
 
+    def _normalize_and_validate(self, obj):
+        """Rename loosely matching keys to the required ones; return obj if they all hold lists, else None."""
+        if not isinstance(obj, dict):
+            return None
+        for k in ANALYSIS_REQUIRED_KEYS:
+            normalized_key = k.replace('_', '')
+            match = None
+            for candidate_key in obj.keys():
+                if candidate_key == k or (isinstance(candidate_key, str) and candidate_key.lower().replace('_', '').replace(' ', '') == normalized_key):
+                    match = candidate_key
+                    break
+            if match is None:
+                obj[k] = []
+            elif match != k:
+                obj[k] = obj.pop(match)
+        if all(isinstance(obj[k], list) for k in ANALYSIS_REQUIRED_KEYS):
+            return obj
+        return None
+
     def _extract_first_valid_json(self, text):
-        required_keys = ["key_issues", "positive_highlights", "guideline_adherence"]
-        cleaned = text.strip().replace('```json', '').replace('```', '').strip()
-        def find_json_candidates(s):
-            stack = []
-            start = None
-            for i, c in enumerate(s):
-                if c == '{':
-                    if not stack:
-                        start = i
-                    stack.append(c)
-                elif c == '}':
-                    if stack:
-                        stack.pop()
-                        if not stack and start is not None:
-                            yield s[start:i+1]
-            return
-        for candidate in find_json_candidates(cleaned):
+        # Fast path: the model usually returns bare (or fenced) JSON
+        try:
+            obj = self._normalize_and_validate(loads(_CODE_FENCE_RE.sub('', text)))
+            if obj is not None:
+                return obj
+        except Exception:
+            pass
+        # Code fences never contain braces, so the scan can run on the raw text
+        for candidate in iter_json_objects(text):
             try:
-                obj = json.loads(candidate)
+                obj = loads(candidate)
             except Exception:
                 try:
                     fixed = candidate.replace("'", '"')
-                    fixed = re.sub(r',\s*([}\]])', r'\1', fixed)
-                    obj = json.loads(fixed)
+                    fixed = _TRAILING_COMMA_RE.sub(r'\1', fixed)
+                    obj = loads(fixed)
                 except Exception:
                     try:
                         obj = ast.literal_eval(candidate)
                     except Exception:
                         continue
-            key_map = {}
-            for k in required_keys:
-                for candidate_key in obj.keys():
-                    if candidate_key == k:
-                        key_map[k] = candidate_key
-                        break
-                    if candidate_key.lower().replace('_', '').replace(' ', '') == k.lower().replace('_', '').replace(' ', ''):
-                        key_map[k] = candidate_key
-                        break
-                else:
-                    key_map[k] = None
-            for k in required_keys:
-                if key_map[k] is None:
-                    obj[k] = []
-                elif key_map[k] != k:
-                    obj[k] = obj.pop(key_map[k])
-            if all(k in obj and isinstance(obj[k], list) for k in required_keys):
-                return obj
-        try:
-            obj = json.loads(cleaned)
-            key_map = {}
-            for k in required_keys:
-                for candidate_key in obj.keys():
-                    if candidate_key == k:
-                        key_map[k] = candidate_key
-                        break
-                    if candidate_key.lower().replace('_', '').replace(' ', '') == k.lower().replace('_', '').replace(' ', ''):
-                        key_map[k] = candidate_key
-                        break
-                else:
-                    key_map[k] = None
-            for k in required_keys:
-                if key_map[k] is None:
-                    obj[k] = []
-                elif key_map[k] != k:
-                    obj[k] = obj.pop(key_map[k])
-            if all(k in obj and isinstance(obj[k], list) for k in required_keys):
+            obj = self._normalize_and_validate(obj)
+            if obj is not None:
                 return obj
-        except Exception:
-            pass
         return None
 
+    def _select_model(self, available_models: List[Dict[str, Any]], model_name: Optional[str] = None) -> str:
+        model_names = [model.get("name", "") for model in available_models]
+        if model_name and model_name in model_names:
+            return model_name
+        selected_model = ollama_service.get_agent_default_model("analysis")
+        if selected_model not in model_names:
+            selected_model = available_models[0]["name"]
+        return selected_model
+
     async def analyze_chat(self, transcript: List[Dict[str, str]], guidelines: Optional[List[Dict[str, str]]] = None, model_name: Optional[str] = None) -> Dict[str, Any]:
         """
         Analyze a chat conversation using Ollama.
@@ -136,72 +162,75 @@ class AnalysisAgent:
             Dictionary containing analysis results
         """
         try:
-            if not ollama_service.is_ollama_running():
+            if not await asyncio.to_thread(ollama_service.is_ollama_running):
                 return self._fallback_result("Ollama is not running", guidelines)
-            available_models = ollama_service.get_available_models()
+            available_models = await asyncio.to_thread(ollama_service.get_available_models)
             if not available_models:
                 return self._fallback_result("No models available in Ollama", guidelines)
-            model_names = [model.get("name", "") for model in available_models]
-            if model_name and model_name in model_names:
-                selected_model = model_name
-            else:
-                selected_model = ollama_service.get_agent_default_model("analysis")
-                if selected_model not in model_names:
-                    selected_model = available_models[0]["name"]
+            selected_model = self._select_model(available_models, model_name)
+            return await self._analyze_with_model(transcript, guidelines, selected_model)
+        except Exception as e:
+            logger.error(f"Error in analysis agent: {e}")
+            return self._fallback_result(str(e), guidelines)
+
+    async def analyze_chats(self, transcripts: List[List[Dict[str, str]]], guidelines: Optional[List[Dict[str, str]]] = None, model_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Analyze several chat conversations against a single model.
+        The Ollama health check and model selection run once for the whole batch,
+        and the per-transcript generations are issued concurrently.
+        Args:
+            transcripts: List of transcripts, each a list of messages with 'sender' and 'text' keys
+            guidelines: Optional list of guidelines to use (otherwise use default)
+            model_name: Name of the model to use (optional, will use first available if not provided)
+        Returns:
+            List of analysis results, in the same order as the transcripts
+        """
+        try:
+            if not await asyncio.to_thread(ollama_service.is_ollama_running):
+                return [self._fallback_result("Ollama is not running", guidelines) for _ in transcripts]
+            available_models = await asyncio.to_thread(ollama_service.get_available_models)
+            if not available_models:
+                return [self._fallback_result("No models available in Ollama", guidelines) for _ in transcripts]
+            selected_model = self._select_model(available_models, model_name)
+        except Exception as e:
+            logger.error(f"Error in analysis agent: {e}")
+            return [self._fallback_result(str(e), guidelines) for _ in transcripts]
+        return list(await asyncio.gather(
+            *[self._analyze_with_model(transcript, guidelines, selected_model) for transcript in transcripts]
+        ))
+
+    async def _analyze_with_model(self, transcript: List[Dict[str, str]], guidelines: Optional[List[Dict[str, str]]], selected_model: str) -> Dict[str, Any]:
+        """Run the prompt/parse/retry loop for one transcript against an already selected model."""
+        try:
             transcript_text = self._format_transcript(transcript)
             guidelines_list = self.get_guidelines(guidelines)
-            guidelines_str = "\n".join([
-                f"- {g['guideline']}: {g['description']}" for g in guidelines_list
-            ])
+            guideline_items = tuple((g['guideline'], g['description']) for g in guidelines_list)
+            # Normalized guideline name -> canonical name, computed once for all retries
+            norm_map = {name.lower().replace(' ', ''): name for name, _ in guideline_items}
             def missing_guidelines(parsed):
                 if not parsed or 'guideline_adherence' not in parsed:
                     return [g['guideline'] for g in guidelines_list]
                 present = set()
                 for g in parsed['guideline_adherence']:
-                    for ref in [g2['guideline'] for g2 in guidelines_list]:
-                        if g.get('guideline', '').lower().replace(' ', '') == ref.lower().replace(' ', ''):
-                            present.add(ref)
+                    ref = norm_map.get(g.get('guideline', '').lower().replace(' ', ''))
+                    if ref is not None:
+                        present.add(ref)
                 return [g['guideline'] for g in guidelines_list if g['guideline'] not in present]
             max_retries = 3
             attempt = 0
             parsed = None
             response = None
             while attempt < max_retries:
-                extra_instructions = None
-                if attempt > 0:
-                    extra_instructions = (
-                        "You must always include at least one key issue or one positive highlight. "
-                        "All guidelines must be present in the 'guideline_adherence' list. Do not leave any required field empty."
-                    )
-                instruction = (
-                    "Analyze the customer service conversation and return ONLY valid JSON with these exact keys: "
-                    "'key_issues' (list of short strings), 'positive_highlights' (list of short strings), "
-                    "and 'guideline_adherence' (list of objects with keys: guideline, status (Passed/Failed), details (1 sentence max)). "
-                    "Always include ALL keys, even if empty. Do not include any explanation or text outside the JSON. "
-                    "IMPORTANT: Only comment on the AGENT's actions, responses, and behavior. Do NOT describe the customer's problem, the chatlog in general, or restate the customer's issue. "
-                )
-                if extra_instructions:
-                    instruction += f" {extra_instructions}"
-                analysis_prompt = f"""
-### Instruction:
-{instruction}
-
-### Input:
-Guidelines:
-{guidelines_str}
-
-Conversation:
-{transcript_text}
-
-### Output:
-"""
-                response = ollama_service.test_generation(selected_model, analysis_prompt)
-                logger.info(f"Raw model response (attempt {attempt+1}): {response}")
+                analysis_prompt = _build_prompt_prefix(guideline_items, attempt > 0) + transcript_text + ANALYSIS_PROMPT_SUFFIX
+                # Only accepted answers are cached, so a rejected one cannot be replayed on retry or later runs
+                response = await ollama_service.test_generation(selected_model, analysis_prompt, cache_response=False)
+                logger.debug("Raw model response (attempt %d): %s", attempt + 1, response)
                 parsed = self._extract_first_valid_json(response)
-                logger.info(f"Parsed model response (attempt {attempt+1}): {parsed}")
+                logger.debug("Parsed model response (attempt %d): %s", attempt + 1, parsed)
                 if parsed and ((parsed.get('key_issues') and len(parsed['key_issues']) > 0) or (parsed.get('positive_highlights') and len(parsed['positive_highlights']) > 0)):
                     missing = missing_guidelines(parsed)
                     if not missing:
+                        ollama_service.cache_generation(selected_model, analysis_prompt, response)
                         # Structure output for frontend
                         return {
                             "key_issues": parsed["key_issues"],
@@ -234,7 +263,6 @@ Conversation:
         except Exception as e:
             logger.error(f"Error in analysis agent: {e}")
             return self._fallback_result(str(e), guidelines)
-        return self._fallback_result("Unknown error in analysis agent.", guidelines)
 
     def _fallback_result(self, error_message: str, guidelines: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
         guidelines_list = self.get_guidelines(guidelines)
@@ -255,16 +283,12 @@ Conversation:
         }
 
     def _format_transcript(self, transcript: List[Dict[str, str]]) -> str:
-        formatted = []
-        for message in transcript:
-            sender = message.get("sender", "Unknown")
-            text = message.get("text", "")
-            timestamp = message.get("timestamp", "")
-            if timestamp:
-                formatted.append(f"[{timestamp}] {sender}: {text}")
-            else:
-                formatted.append(f"{sender}: {text}")
-        return "\n".join(formatted)
+        return "\n".join([
+            f"[{m['timestamp']}] {m.get('sender', 'Unknown')}: {m.get('text', '')}"
+            if m.get("timestamp") else
+            f"{m.get('sender', 'Unknown')}: {m.get('text', '')}"
+            for m in transcript
+        ])
 
     def _generate_analysis_summary(self, guidelines: List[Dict[str, Any]]) -> str:
         """Generate a summary paragraph for each guideline, its status, and details."""
@@ -1,26 +1,131 @@
+import asyncio
 import logging
 import json
-import re
+import copy
+import hashlib
+from collections import OrderedDict
 from typing import Dict, Any, List, Optional
+from ..config import settings
 from .ollama_service import ollama_service
+from .json_extract import find_outer_json, loads, dumps, strip_think
 
 logger = logging.getLogger(__name__)
 
+EVALUATION_RUBRIC = """You are an expert evaluator of customer service chatlogs. Assess the following conversation using these four metrics:
+
+1. **Coherence (1–5)** — Does the conversation flow logically and stay on topic?
+2. **Relevance (1–5)** — Does the agent respond directly and appropriately to the customer’s concerns?
+3. **Politeness (1–5)** — Is the agent professional, respectful, and empathetic in tone?
+4. **Resolution (0 or 1)** — Was the customer’s issue satisfactorily resolved? (1 = resolved, 0 = unresolved)
+
+"""
+
+EVALUATION_EXAMPLE = """Example Conversation (Mediocre/Bad Agent):
+Message 1 customer: I am absolutely furious! I was charged $75 for premium support last month, but I never requested premium support! I've been a loyal customer for five years, and this is unacceptable. I'm already stressed with everything going on, and now this?!
+Message 2 agent: Okay. Let me check... uh... yeah, I see the charge. Did you... click something?
+Message 3 customer: Click something?! No! I didn't click anything! I specifically remember reviewing my plan and it did not include premium support. I need this removed from my bill immediately. This is causing me so much anxiety!
+Message 4 agent: Alright, alright. I'm processing a refund now. It'll probably take a few days. Anything else?
+Message 5 customer: A few days?! Can you be more specific? I need to know exactly when I can expect to see the credit. And what's to stop this from happening again? I'm seriously considering switching providers.
+Message 6 agent: It'll show up on your next bill. Look, I have other customers waiting. Bye.
+
+Example Evaluation Output:
+{
+  "coherence": {"score": 2, "reasoning": "The agent’s responses are abrupt, lack follow-through, and do not clearly guide the customer through the resolution process."},
+  "politeness": {"score": 1, "reasoning": "While the agent initially responds without hostility, they show little empathy and end the conversation dismissively."},
+  "relevance": {"score": 3, "reasoning": "The agent acknowledges the issue and processes a refund, but fails to address important follow-up concerns raised by the customer."},
+  "resolution": {"score": 0, "reasoning": "The resolution is vague, lacks clarity on timing or prevention of recurrence, and leaves the customer dissatisfied."}
+}
+
+"""
+
+# Stands in for the worked example in fast mode so the model still sees the output shape
+EVALUATION_OUTPUT_FORMAT = """Respond with JSON in this format:
+{"coherence": {"score": <1-5>, "reasoning": "<one sentence>"}, "politeness": {"score": <1-5>, "reasoning": "<one sentence>"}, "relevance": {"score": <1-5>, "reasoning": "<one sentence>"}, "resolution": {"score": <0 or 1>, "reasoning": "<one sentence>"}}
+
+"""
+
+EVALUATION_INSTRUCTIONS = EVALUATION_RUBRIC + EVALUATION_EXAMPLE
+
+# Metrics every evaluation must contain; resolution is scored 0/1, the rest 1-5
+EVALUATION_REQUIRED_KEYS = ("coherence", "relevance", "politeness", "resolution")
+
+# Stand-ins used by the summary for a metric the result lacks; never mutated
+_DEFAULT_METRIC = {"score": 3, "reasoning": "No reasoning provided."}
+_DEFAULT_RESOLUTION = {"score": 0, "reasoning": "No reasoning provided."}
+
+# JSON schemas passed to Ollama so decoding can only produce well-formed evaluations.
+# Properties follow the order of the worked example's output.
+def _metric_schema(scores: List[int]) -> Dict[str, Any]:
+    return {
+        "type": "object",
+        "properties": {"score": {"type": "integer", "enum": scores}, "reasoning": {"type": "string"}},
+        "required": ["score", "reasoning"],
+    }
+
+EVALUATION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "coherence": _metric_schema([1, 2, 3, 4, 5]),
+        "politeness": _metric_schema([1, 2, 3, 4, 5]),
+        "relevance": _metric_schema([1, 2, 3, 4, 5]),
+        "resolution": _metric_schema([0, 1]),
+    },
+    "required": list(EVALUATION_REQUIRED_KEYS),
+}
+EVALUATION_BATCH_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "evaluations": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"id": {"type": "integer"}, **EVALUATION_SCHEMA["properties"]},
+                "required": ["id", *EVALUATION_REQUIRED_KEYS],
+            },
+        },
+    },
+    "required": ["evaluations"],
+}
+
+# The prompt up to the transcript never changes, so Ollama can reuse its cached
+# prefix across evaluations; keep anything per-call out of it.
+EVALUATION_PROMPT_PREFIX = (
+    "\n" + EVALUATION_INSTRUCTIONS
+    + "Evaluate this Chatlog (Be strict and do not make assumptions):\n"
+)
+EVALUATION_FAST_PROMPT_PREFIX = (
+    "\n" + EVALUATION_RUBRIC + EVALUATION_OUTPUT_FORMAT
+    + "Evaluate this Chatlog (Be strict and do not make assumptions):\n"
+)
+EVALUATION_PROMPT_SUFFIX = "\n\n### Response:\n"
+
 class EvaluationAgent:
     """
     Evaluation agent that generates four specific metrics with reasoning.
     """
     
+    # Batch prompts hold at most this many transcripts and roughly this many prompt tokens
+    BATCH_MAX_SIZE = 8
+    BATCH_PROMPT_TOKEN_BUDGET = 6000
+    # Output tokens allowed per transcript in a batch response
+    BATCH_TOKENS_PER_EVALUATION = 512
+    
     def __init__(self):
         self.name = "evaluation_agent"
+        # (model, transcript) digest -> evaluation result, least recently used first
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._cache_size = settings.EVALUATION_CACHE_SIZE
+        # Models left resident in Ollama by evaluations, released on shutdown
+        self._resident_models = set()
     
-    async def evaluate_chat(self, transcript: List[Dict[str, str]], model_name: str = None) -> Dict[str, Any]:
+    async def evaluate_chat(self, transcript: List[Dict[str, str]], model_name: str = None, fast: bool = False) -> Dict[str, Any]:
         """
         Evaluate a chat conversation using the evaluation agent.
         
         Args:
             transcript: List of messages with 'sender' and 'text' keys
             model_name: Name of the model to use (optional, will use default if not provided)
+            fast: Leave the worked example out of the prompt, roughly halving prompt tokens
             
         Returns:
             Dictionary containing evaluation results or error message
@@ -32,75 +137,60 @@ class EvaluationAgent:
             if not model_name:
                 model_name = ollama_service.get_default_model()
             
-            logger.info(f"Using model: {model_name}")
+            logger.info("Using model: %s", model_name)
             
             # Format transcript for evaluation
             formatted_transcript = self._format_transcript(transcript)
             
+            cache_key = self._cache_key(model_name, formatted_transcript, fast)
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                self._cache.move_to_end(cache_key)
+                logger.info("Returning cached evaluation for identical transcript")
+                return {"result": copy.deepcopy(cached)}
+            
             # Create evaluation prompt
-            evaluation_prompt = self._create_evaluation_prompt(formatted_transcript)
+            evaluation_prompt = self._create_evaluation_prompt(formatted_transcript, fast)
             
             logger.info("Generating evaluation response...")
             
             # Generate evaluation using Ollama
-            response = ollama_service.generate_evaluation(model_name, evaluation_prompt)
+            # Only responses that pass validation below are cached, so a bad one is never replayed
+            response = await ollama_service.generate_evaluation(
+                model_name, evaluation_prompt, response_format=EVALUATION_SCHEMA, cache_response=False
+            )
+            self._resident_models.add(model_name)
             
             if response.startswith("Error"):
-                return {
-                    "error_message": response,
-                    "result": None
-                }
+                return self._error_result(response)
             
             # Parse the response to extract metrics
             try:
-                # Clean the response to extract JSON
-                cleaned_response = response.strip()
-                
-                # Remove think tags if present
-                if "<think>" in cleaned_response:
-                    # Extract text after </think>
-                    parts = cleaned_response.split("</think>")
-                    if len(parts) > 1:
-                        cleaned_response = parts[1].strip()
-                    else:
-                        # If no closing tag, remove everything before the first actual response
-                        cleaned_response = cleaned_response.replace("<think>", "").strip()
-                
-                # Try to find JSON in the response
-                json_start = cleaned_response.find('{')
-                json_end = cleaned_response.rfind('}') + 1
-                
-                if json_start != -1 and json_end > json_start:
-                    json_str = cleaned_response[json_start:json_end]
-                    parsed_result = json.loads(json_str)
-                else:
-                    # If no JSON found, try to parse the entire response
-                    parsed_result = json.loads(cleaned_response)
-                
-                # Validate the structure
-                required_fields = ["coherence", "relevance", "politeness", "resolution"]
-                for field in required_fields:
-                    if field not in parsed_result:
-                        raise ValueError(f"Missing required field: {field}")
-                    
-                    if not isinstance(parsed_result[field], dict):
-                        raise ValueError(f"Field {field} must be an object")
+                cleaned_response = response
+                try:
+                    # Schema-constrained output parses as-is
+                    parsed_result = loads(response)
+                except json.JSONDecodeError:
+                    # Servers or models that ignore the format option may wrap the JSON in prose
+                    cleaned_response = strip_think(response)
                     
-                    if "score" not in parsed_result[field] or "reasoning" not in parsed_result[field]:
-                        raise ValueError(f"Field {field} must have 'score' and 'reasoning' properties")
-                
-                # Validate score ranges
-                for field in ["coherence", "relevance", "politeness"]:
-                    score = parsed_result[field]["score"]
-                    if not isinstance(score, (int, float)) or score < 1 or score > 5:
-                        raise ValueError(f"{field} score must be between 1 and 5, got {score}")
+                    # Try to find JSON in the response
+                    json_str = find_outer_json(cleaned_response)
+                    if json_str is not None:
+                        parsed_result = loads(json_str)
+                    else:
+                        # If no JSON found, try to parse the entire response
+                        parsed_result = loads(cleaned_response)
+                if not isinstance(parsed_result, dict):
+                    raise ValueError("Evaluation response must be a JSON object")
                 
-                # Validate resolution score (should be 0 or 1)
-                resolution_score = parsed_result["resolution"]["score"]
-                if not isinstance(resolution_score, (int, float)) or resolution_score not in [0, 1]:
-                    raise ValueError(f"Resolution score must be 0 or 1, got {resolution_score}")
+                self._validate_metrics(parsed_result)
                 
-                logger.info(f"Successfully parsed evaluation response with scores: coherence={parsed_result['coherence']['score']}, relevance={parsed_result['relevance']['score']}, politeness={parsed_result['politeness']['score']}, resolution={parsed_result['resolution']['score']}")
+                logger.info(
+                    "Successfully parsed evaluation response with scores: coherence=%s, relevance=%s, politeness=%s, resolution=%s",
+                    parsed_result["coherence"]["score"], parsed_result["relevance"]["score"],
+                    parsed_result["politeness"]["score"], parsed_result["resolution"]["score"]
+                )
                 
                 # Add raw_output to parsed_result
                 parsed_result["raw_output"] = response
@@ -109,72 +199,227 @@ class EvaluationAgent:
                 logger.error(f"Failed to parse JSON response: {e}")
                 logger.error(f"Raw response: {response}")
                 logger.error(f"Cleaned response: {cleaned_response}")
-                return {
-                    "error_message": f"Failed to parse evaluation response as JSON: {str(e)}",
-                    "result": None
-                }
+                return self._error_result(f"Failed to parse evaluation response as JSON: {str(e)}")
             except ValueError as e:
                 logger.error(f"Invalid evaluation response structure: {e}")
                 logger.error(f"Raw response: {response}")
-                return {
-                    "error_message": f"Invalid evaluation response structure: {str(e)}",
-                    "result": None
-                }
-            
-            # Generate evaluation summary
-            evaluation_summary = self._generate_evaluation_summary(parsed_result, formatted_transcript, model_name)
-            
-            return {
-                "result": {
-                    **parsed_result,
-                    "evaluation_summary": evaluation_summary,
-                    "model_used": model_name,
-                    "agent": self.name
-                }
-            }
+                return self._error_result(f"Invalid evaluation response structure: {str(e)}")
+            
+            ollama_service.cache_evaluation(model_name, evaluation_prompt, response, response_format=EVALUATION_SCHEMA)
+            result = self._build_result(parsed_result, formatted_transcript, model_name)
+            self._store_cached(cache_key, result)
+            return {"result": result}
             
         except Exception as e:
             logger.error(f"Error in evaluation agent: {e}")
-            return {
-                "error_message": str(e),
-                "result": None
-            }
-        finally:
-            # Automatically unload the model after evaluation
+            return self._error_result(str(e))
+    
+    async def evaluate_chats(self, transcripts: List[List[Dict[str, str]]], model_name: str = None, fast: bool = False) -> List[Dict[str, Any]]:
+        """
+        Evaluate several chat conversations concurrently, one prompt each.
+        
+        At most EVALUATION_CONCURRENCY requests are in flight at once so the
+        Ollama server's parallel slots are filled without queueing the rest there.
+        
+        Args:
+            transcripts: List of transcripts, each a list of messages with 'sender' and 'text' keys
+            model_name: Name of the model to use (optional, will use default if not provided)
+            fast: Leave the worked example out of each prompt
+            
+        Returns:
+            One evaluate_chat-shaped dictionary per transcript, in input order
+        """
+        if not model_name:
+            model_name = ollama_service.get_default_model()
+        semaphore = asyncio.Semaphore(max(1, settings.EVALUATION_CONCURRENCY))
+        
+        async def evaluate(transcript: List[Dict[str, str]]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.evaluate_chat(transcript, model_name, fast)
+        
+        return list(await asyncio.gather(*[evaluate(transcript) for transcript in transcripts]))
+    
+    async def evaluate_chats_batch(self, transcripts: List[List[Dict[str, str]]], model_name: str = None) -> List[Dict[str, Any]]:
+        """
+        Evaluate several chat conversations, packing as many as fit into each prompt.
+        
+        The instructions and worked example are sent once per batch rather than once
+        per transcript. Entries the model leaves out or gets wrong are re-run through
+        evaluate_chat, so every transcript still gets a result.
+        
+        Args:
+            transcripts: List of transcripts, each a list of messages with 'sender' and 'text' keys
+            model_name: Name of the model to use (optional, will use default if not provided)
+            
+        Returns:
+            One evaluate_chat-shaped dictionary per transcript, in input order
+        """
+        if not model_name:
+            model_name = ollama_service.get_default_model()
+        
+        formatted = [self._format_transcript(t) for t in transcripts]
+        results: List[Optional[Dict[str, Any]]] = [None] * len(transcripts)
+        
+        pending = []
+        for i, formatted_transcript in enumerate(formatted):
+            cache_key = self._cache_key(model_name, formatted_transcript)
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                self._cache.move_to_end(cache_key)
+                results[i] = {"result": copy.deepcopy(cached)}
+            else:
+                pending.append(i)
+        
+        for batch in self._split_batches(pending, formatted):
+            if len(batch) > 1:
+                logger.info("Evaluating %d transcripts in one prompt with model: %s", len(batch), model_name)
+                prompt = self._create_batch_evaluation_prompt([formatted[i] for i in batch])
+                num_predict = self.BATCH_TOKENS_PER_EVALUATION * len(batch)
+                response = await ollama_service.generate_evaluation(
+                    model_name, prompt, num_predict=num_predict,
+                    response_format=EVALUATION_BATCH_SCHEMA, cache_response=False
+                )
+                self._resident_models.add(model_name)
+                parsed_batch = self._parse_batch_response(response, len(batch))
+                if len(parsed_batch) == len(batch):
+                    ollama_service.cache_evaluation(model_name, prompt, response, num_predict, EVALUATION_BATCH_SCHEMA)
+                for position, parsed_result in parsed_batch.items():
+                    i = batch[position]
+                    result = self._build_result(parsed_result, formatted[i], model_name)
+                    self._store_cached(self._cache_key(model_name, formatted[i]), result)
+                    results[i] = {"result": result}
+        
+        # Entries the batches left out are evaluated singly, concurrently under EVALUATION_CONCURRENCY
+        missing = [i for i in pending if results[i] is None]
+        if missing:
+            fallback_results = await self.evaluate_chats([transcripts[i] for i in missing], model_name)
+            for i, result in zip(missing, fallback_results):
+                results[i] = result
+        
+        return results
+    
+    async def shutdown(self):
+        """Release the models kept resident by evaluations; called when the application stops."""
+        for model_name in self._resident_models:
+            await ollama_service.release_model(model_name)
+        self._resident_models.clear()
+    
+    def _split_batches(self, indices: List[int], formatted: List[str]) -> List[List[int]]:
+        """Group transcript indices so each batch prompt stays within the token budget (about 4 chars/token)."""
+        budget = self.BATCH_PROMPT_TOKEN_BUDGET * 4
+        batches: List[List[int]] = []
+        current: List[int] = []
+        used = 0
+        for i in indices:
+            size = len(formatted[i])
+            if current and (used + size > budget or len(current) >= self.BATCH_MAX_SIZE):
+                batches.append(current)
+                current, used = [], 0
+            current.append(i)
+            used += size
+        if current:
+            batches.append(current)
+        return batches
+    
+    def _parse_batch_response(self, response: str, expected: int) -> Dict[int, Dict[str, Any]]:
+        """Return the valid evaluations in a batch response, keyed by their position in the batch."""
+        if response.startswith("Error"):
+            logger.error(f"Batch evaluation failed: {response}")
+            return {}
+        
+        json_str = find_outer_json(strip_think(response))
+        try:
+            data = loads(json_str) if json_str is not None else None
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse batch evaluation response as JSON: {e}")
+            data = None
+        entries = data.get("evaluations") if isinstance(data, dict) else None
+        if not isinstance(entries, list):
+            logger.warning("Batch evaluation response has no evaluations array, falling back to single evaluations")
+            return {}
+        
+        parsed: Dict[int, Dict[str, Any]] = {}
+        for entry in entries:
+            if not isinstance(entry, dict):
+                continue
+            position = entry.pop("id", None)
+            if not isinstance(position, int) or not 0 <= position < expected or position in parsed:
+                continue
             try:
-                logger.info(f"Auto-unloading model {model_name} after evaluation completion")
-                ollama_service.unload_model()
-            except Exception as e:
-                logger.warning(f"Failed to auto-unload model after evaluation: {e}")
+                self._validate_metrics(entry)
+            except ValueError as e:
+                logger.warning(f"Invalid batch evaluation entry {position}: {e}")
+                continue
+            entry["raw_output"] = dumps(entry)
+            parsed[position] = entry
+        
+        if len(parsed) < expected:
+            logger.warning(f"Batch evaluation returned {len(parsed)} of {expected} valid entries")
+        return parsed
     
-    def _create_evaluation_prompt(self, transcript_text: str) -> str:
+    def _validate_metrics(self, parsed_result: Dict[str, Any]):
+        """Raise ValueError unless parsed_result holds all four metrics with in-range scores."""
+        for field in EVALUATION_REQUIRED_KEYS:
+            if field not in parsed_result:
+                raise ValueError(f"Missing required field: {field}")
+            
+            metric = parsed_result[field]
+            if not isinstance(metric, dict):
+                raise ValueError(f"Field {field} must be an object")
+            
+            if "score" not in metric or "reasoning" not in metric:
+                raise ValueError(f"Field {field} must have 'score' and 'reasoning' properties")
+            
+            score = metric["score"]
+            if field == "resolution":
+                # Resolution is binary
+                if not isinstance(score, (int, float)) or score not in (0, 1):
+                    raise ValueError(f"Resolution score must be 0 or 1, got {score}")
+            elif not isinstance(score, (int, float)) or score < 1 or score > 5:
+                raise ValueError(f"{field} score must be between 1 and 5, got {score}")
+    
+    def _build_result(self, parsed_result: Dict[str, Any], formatted_transcript: str, model_name: str) -> Dict[str, Any]:
+        """Attach the summary and provenance fields to a freshly parsed evaluation, in place."""
+        parsed_result["evaluation_summary"] = self._generate_evaluation_summary(parsed_result, formatted_transcript, model_name)
+        parsed_result["model_used"] = model_name
+        parsed_result["agent"] = self.name
+        return parsed_result
+    
+    def _cache_key(self, model_name: str, formatted_transcript: str, fast: bool = False) -> str:
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(model_name.encode("utf-8"))
+        digest.update(b"\0fast\0" if fast else b"\0")
+        digest.update(formatted_transcript.encode("utf-8"))
+        return digest.hexdigest()
+    
+    def _store_cached(self, cache_key: str, result: Dict[str, Any]):
+        """Remember a successful evaluation, evicting the least recently used entry when full."""
+        if self._cache_size <= 0:
+            return
+        self._cache[cache_key] = copy.deepcopy(result)
+        self._cache.move_to_end(cache_key)
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+    
+    def _error_result(self, error_message: str) -> Dict[str, Any]:
+        """Build the failure shape returned by evaluate_chat."""
+        return {"error_message": error_message, "result": None}
+
+    def _create_evaluation_prompt(self, transcript_text: str, fast: bool = False) -> str:
         """Create a comprehensive evaluation prompt in Alpaca format with clear resolution criteria."""
+        prefix = EVALUATION_FAST_PROMPT_PREFIX if fast else EVALUATION_PROMPT_PREFIX
+        return prefix + transcript_text + EVALUATION_PROMPT_SUFFIX
+    
+    def _create_batch_evaluation_prompt(self, transcript_texts: List[str]) -> str:
+        """Create one prompt that asks for a JSON array with an evaluation per chatlog."""
+        chatlogs = "\n\n".join(
+            f"Chatlog {i}:\n{text}" for i, text in enumerate(transcript_texts)
+        )
         return f"""
-You are an expert evaluator of customer service chatlogs. Assess the following conversation using these four metrics:
-
-1. **Coherence (1–5)** — Does the conversation flow logically and stay on topic?
-2. **Relevance (1–5)** — Does the agent respond directly and appropriately to the customer’s concerns?
-3. **Politeness (1–5)** — Is the agent professional, respectful, and empathetic in tone?
-4. **Resolution (0 or 1)** — Was the customer’s issue satisfactorily resolved? (1 = resolved, 0 = unresolved)
-
-Example Conversation (Mediocre/Bad Agent):
-Message 1 customer: I am absolutely furious! I was charged $75 for premium support last month, but I never requested premium support! I've been a loyal customer for five years, and this is unacceptable. I'm already stressed with everything going on, and now this?!
-Message 2 agent: Okay. Let me check... uh... yeah, I see the charge. Did you... click something?
-Message 3 customer: Click something?! No! I didn't click anything! I specifically remember reviewing my plan and it did not include premium support. I need this removed from my bill immediately. This is causing me so much anxiety!
-Message 4 agent: Alright, alright. I'm processing a refund now. It'll probably take a few days. Anything else?
-Message 5 customer: A few days?! Can you be more specific? I need to know exactly when I can expect to see the credit. And what's to stop this from happening again? I'm seriously considering switching providers.
-Message 6 agent: It'll show up on your next bill. Look, I have other customers waiting. Bye.
+{EVALUATION_INSTRUCTIONS}Evaluate each of the following {len(transcript_texts)} Chatlogs independently (Be strict and do not make assumptions).
+Return a JSON object whose "evaluations" array holds one object per chatlog, in order. Each object has an "id" field with the chatlog number followed by the four metrics in the format shown above, e.g. {{"evaluations": [{{"id": 0, "coherence": {{...}}, ...}}, {{"id": 1, ...}}]}}.
 
-Example Evaluation Output:
-{{
-  "coherence": {{"score": 2, "reasoning": "The agent’s responses are abrupt, lack follow-through, and do not clearly guide the customer through the resolution process."}},
-  "politeness": {{"score": 1, "reasoning": "While the agent initially responds without hostility, they show little empathy and end the conversation dismissively."}},
-  "relevance": {{"score": 3, "reasoning": "The agent acknowledges the issue and processes a refund, but fails to address important follow-up concerns raised by the customer."}},
-  "resolution": {{"score": 0, "reasoning": "The resolution is vague, lacks clarity on timing or prevention of recurrence, and leaves the customer dissatisfied."}}
-}}
-
-Evaluate this Chatlog (Be strict and do not make assumptions):
-{transcript_text}
+{chatlogs}
 
 ### Response:
 """
@@ -192,10 +437,10 @@ Evaluate this Chatlog (Be strict and do not make assumptions):
     def _generate_evaluation_summary(self, parsed_result: Dict[str, Any], transcript_text: str, model_name: str) -> str:
         """Generate a summary paragraph for evaluation metrics and reasoning."""
         # Each metric is an integer (1-5), resolution is 0 or 1
-        coherence = parsed_result.get("coherence", {"score": 3, "reasoning": "No reasoning provided."})
-        relevance = parsed_result.get("relevance", {"score": 3, "reasoning": "No reasoning provided."})
-        politeness = parsed_result.get("politeness", {"score": 3, "reasoning": "No reasoning provided."})
-        resolution = parsed_result.get("resolution", {"score": 0, "reasoning": "No reasoning provided."})
+        coherence = parsed_result.get("coherence", _DEFAULT_METRIC)
+        relevance = parsed_result.get("relevance", _DEFAULT_METRIC)
+        politeness = parsed_result.get("politeness", _DEFAULT_METRIC)
+        resolution = parsed_result.get("resolution", _DEFAULT_RESOLUTION)
 
         summary = (
             f"Coherence: {int(coherence['score'])}. {coherence['reasoning'].strip()} "
@@ -207,17 +452,12 @@ Evaluate this Chatlog (Be strict and do not make assumptions):
     
     def _format_transcript(self, transcript: List[Dict[str, str]]) -> str:
         """Format transcript for evaluation."""
-        formatted = []
-        for i, message in enumerate(transcript, 1):
-            sender = message.get("sender", "Unknown")
-            text = message.get("text", "")
-            timestamp = message.get("timestamp", "")
-            
-            if timestamp:
-                formatted.append(f"Message {i} [{timestamp}] {sender}: {text}")
-            else:
-                formatted.append(f"Message {i} {sender}: {text}")
-        return "\n".join(formatted)
+        return "\n".join([
+            f"Message {i} [{m['timestamp']}] {m.get('sender', 'Unknown')}: {m.get('text', '')}"
+            if m.get("timestamp") else
+            f"Message {i} {m.get('sender', 'Unknown')}: {m.get('text', '')}"
+            for i, m in enumerate(transcript, 1)
+        ])
 
 # Global evaluation agent instance
 evaluation_agent = EvaluationAgent() 
\ No newline at end of file
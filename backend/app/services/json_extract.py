@@ -0,0 +1,97 @@
+import json
+import re
+from typing import Any, Iterator, Optional, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# A <think> reasoning block; an unclosed tag matches just the tag so the answer after it survives
+_THINK_RE = re.compile(r"<think>(?:.*?</think>)?", re.DOTALL)
+
+
+def loads(text: Union[str, bytes]) -> Any:
+    """
+    Parse a JSON document, using orjson when it is installed.
+
+    orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers can keep
+    catching the stdlib exception either way.
+    """
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def dumps(obj: Any) -> str:
+    """Serialize obj to a compact JSON string, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj)
+
+
+def iter_json_objects(text: str) -> Iterator[str]:
+    """
+    Yield every top-level {...} span in text, in order of appearance.
+
+    Braces inside double-quoted strings (including escaped quotes) are ignored,
+    so reasoning such as "reply with {name}" does not cut an object short. An
+    opening brace that is never closed is skipped, and complete objects inside
+    it are yielded instead. The text is scanned once, so truncated output with
+    many unclosed braces stays linear.
+    """
+    # Open brace positions; spans closed while an outer brace is still open wait in
+    # pending until the scan shows whether that outer brace ever closes
+    stack = []
+    pending = []
+    in_string = False
+    escape = False
+    i = 0
+    length = len(text)
+    while i < length:
+        if not stack:
+            # Outside any object quotes are prose, so jump straight to the next brace
+            i = text.find('{', i)
+            if i == -1:
+                break
+            stack.append(i)
+            i += 1
+            continue
+        c = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif c == '\\':
+                escape = True
+            elif c == '"' or c == '\n':
+                # JSON strings cannot hold a raw newline, so one means a cut-off string
+                in_string = False
+        elif c == '"':
+            in_string = True
+        elif c == '{':
+            stack.append(i)
+        elif c == '}':
+            start = stack.pop()
+            if not stack:
+                # Outermost object closed; anything pending lies inside it
+                pending.clear()
+                yield text[start:i + 1]
+            else:
+                # Drop spans nested in this one before recording it
+                while pending and pending[-1][0] > start:
+                    pending.pop()
+                pending.append((start, i + 1))
+        i += 1
+    # Whatever is left open never closed, so its complete inner objects are top level
+    for start, end in pending:
+        yield text[start:end]
+
+
+def find_outer_json(text: str) -> Optional[str]:
+    """Return the first complete top-level JSON object in text, or None if there is none."""
+    return next(iter_json_objects(text), None)
+
+
+def strip_think(text: str, count: int = 0) -> str:
+    """Remove <think> reasoning blocks (all of them, or the first count) and surrounding whitespace."""
+    return _THINK_RE.sub("", text, count=count).strip()
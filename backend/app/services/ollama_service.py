@@ -1,11 +1,15 @@
+import asyncio
 import requests
+from requests.adapters import HTTPAdapter
+import httpx
 import logging
 import psutil
-import json
 import time
-from typing import Dict, Any, List, Optional
+from typing import AsyncIterator, Dict, Any, List, Optional, Union
 from pathlib import Path
 from ..config import settings
+from .json_extract import dumps, loads, strip_think
+from .response_cache import ResponseCache
 
 logger = logging.getLogger(__name__)
 
@@ -18,25 +22,89 @@ class OllamaService:
         self._system_info_cache = {}
         self._cache_timestamp = 0
         self._cache_duration = 5  # Cache for 5 seconds
+        # CPU count/frequency and GPU names/total memory do not change while the process runs
+        try:
+            cpu_freq = psutil.cpu_freq()
+        except Exception as e:
+            # Some platforms cannot report a frequency; it must not stop the app from importing
+            logger.warning(f"CPU frequency unavailable: {e}")
+            cpu_freq = None
+        self._static_cpu_info = {
+            "count": psutil.cpu_count(),
+            "frequency": cpu_freq._asdict() if cpu_freq else None
+        }
+        self._gpu_static: Optional[Dict[str, Any]] = None
+        psutil.cpu_percent(interval=None)  # Prime the counter so later non-blocking reads are meaningful
+        self._status_cache = {}
+        self._status_cache_timestamp = 0
+        self._status_cache_duration = 0.25  # Coalesces the status calls of one frontend poll
+        self._alive_cache_timestamp = 0
+        self._alive_cache_value = False
+        self._alive_cache_duration = 2  # One health probe covers every call in a pipeline stage
+        self._models_cache: Optional[List[Dict[str, Any]]] = None
+        self._models_cache_timestamp = 0
+        self._models_cache_duration = 5  # Cache for 5 seconds
+        self._client: Optional[httpx.AsyncClient] = None
+        # Pooled keep-alive connections for the synchronous calls (health checks, tags, pull)
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=10, max_retries=0))
+        self.response_cache = ResponseCache(settings.LLM_CACHE_DIR, enabled=settings.LLM_CACHE_ENABLED)
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared async HTTP client, created on first use so generation calls reuse pooled connections"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(300.0, connect=10.0),  # 5 minutes for slow models
+                limits=httpx.Limits(keepalive_expiry=60)
+            )
+        return self._client
+    
+    @property
+    def keep_alive(self) -> Union[int, str]:
+        """OLLAMA_KEEP_ALIVE in the form Ollama expects: bare numbers as seconds, otherwise a duration string"""
+        value = settings.OLLAMA_KEEP_ALIVE.strip()
+        return int(value) if value.lstrip("-").isdigit() else value
+    
+    async def aclose(self):
+        """Close the shared HTTP clients"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self.session.close()
         
     def is_ollama_running(self) -> bool:
-        """Check if Ollama is running"""
+        """Check if Ollama is running (with caching)"""
+        current_time = time.monotonic()
+        if (current_time - self._alive_cache_timestamp) < self._alive_cache_duration:
+            return self._alive_cache_value
+        
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=2)  # Reduced timeout
-            return response.status_code == 200
+            # HEAD / is Ollama's bare liveness route: no body to transfer or parse
+            response = self.session.head(f"{self.base_url}/", timeout=(0.5, 2))  # Fail fast when unreachable
+            running = response.status_code == 200
         except Exception as e:
             logger.warning(f"Ollama not running: {e}")
-            return False
+            running = False
+        
+        self._alive_cache_value = running
+        self._alive_cache_timestamp = time.monotonic()
+        return running
     
     def get_available_models(self) -> List[Dict[str, Any]]:
-        """Get list of available models from Ollama"""
+        """Get list of available models from Ollama (with caching)"""
+        current_time = time.monotonic()
+        if (current_time - self._models_cache_timestamp) < self._models_cache_duration and self._models_cache is not None:
+            return self._models_cache
+        
         try:
             if not self.is_ollama_running():
                 return []
             
-            response = requests.get(f"{self.base_url}/api/tags", timeout=5)
+            response = self.session.get(f"{self.base_url}/api/tags", timeout=5)
             if response.status_code == 200:
-                data = response.json()
+                data = loads(response.content)
                 models = []
                 
                 for model in data.get("models", []):
@@ -49,6 +117,8 @@ class OllamaService:
                         "details": model.get("details", {})
                     })
                 
+                self._models_cache = models
+                self._models_cache_timestamp = time.monotonic()
                 return models
             else:
                 logger.error(f"Failed to get models from Ollama: {response.status_code}")
@@ -73,6 +143,10 @@ class OllamaService:
     
     def load_model(self, model_name: str) -> bool:
         """Load a model in Ollama (set as current model)"""
+        # Already the current model, so it was verified when it was set
+        if model_name == self.current_model:
+            return True
+        
         try:
             if not self.is_ollama_running():
                 logger.error("Ollama is not running")
@@ -88,6 +162,7 @@ class OllamaService:
             
             # Set as current model (Ollama loads models on-demand, so we just track it)
             self.current_model = model_name
+            self._invalidate_model_status()
             logger.info(f"✅ Model {model_name} set as current model")
             return True
                 
@@ -109,6 +184,7 @@ class OllamaService:
             # Clear the current model
             previous_model = self.current_model
             self.current_model = None
+            self._invalidate_model_status()
             logger.info(f"✅ Model {previous_model} unloaded successfully")
             return True
                 
@@ -116,6 +192,33 @@ class OllamaService:
             logger.error(f"Error unloading model: {e}")
             return False
     
+    async def warm_model(self, model_name: str) -> bool:
+        """Have Ollama load a model into memory now so the first real request does not pay the load time"""
+        try:
+            # A generate request without a prompt only loads the model
+            response = await self.client.post("/api/generate", json={"model": model_name, "keep_alive": self.keep_alive})
+            if response.status_code == 200:
+                logger.info(f"✅ Model {model_name} warmed up in Ollama memory")
+                return True
+            logger.error(f"Failed to warm up model {model_name}: {response.status_code}")
+            return False
+        except Exception as e:
+            logger.error(f"Error warming up model {model_name}: {e}")
+            return False
+    
+    async def release_model(self, model_name: str) -> bool:
+        """Ask Ollama to evict a model from memory now instead of when keep_alive expires"""
+        try:
+            response = await self.client.post("/api/generate", json={"model": model_name, "keep_alive": 0})
+            if response.status_code == 200:
+                logger.info(f"✅ Model {model_name} released from Ollama memory")
+                return True
+            logger.error(f"Failed to release model {model_name}: {response.status_code}")
+            return False
+        except Exception as e:
+            logger.error(f"Error releasing model {model_name}: {e}")
+            return False
+    
     def pull_model(self, model_name: str) -> bool:
         """Pull a model from Ollama registry"""
         try:
@@ -124,11 +227,12 @@ class OllamaService:
                 return False
             
             # Pull the model
-            response = requests.post(f"{self.base_url}/api/pull", json={
+            response = self.session.post(f"{self.base_url}/api/pull", json={
                 "name": model_name
             })
             
             if response.status_code == 200:
+                self.invalidate_models_cache()
                 logger.info(f"✅ Model {model_name} pulled successfully")
                 return True
             else:
@@ -139,73 +243,136 @@ class OllamaService:
             logger.error(f"Error pulling model {model_name}: {e}")
             return False
     
-    def test_generation(self, model_name: str, prompt: str = "Hello, how are you?") -> str:
-        """Test model generation"""
+    async def test_generation(self, model_name: str, prompt: str = "Hello, how are you?", cache_response: bool = True) -> str:
+        """
+        Test model generation.
+        Pass cache_response=False when the caller validates the response first; it can then
+        store an accepted response with cache_generation().
+        """
         try:
-            if not self.is_ollama_running():
+            cached = self.response_cache.get(model_name, prompt)
+            if cached is not None:
+                return cached
+            
+            if not await asyncio.to_thread(self.is_ollama_running):
                 return "Error: Ollama is not running"
             
-            response = requests.post(f"{self.base_url}/api/generate", json={
+            response = await self.client.post("/api/generate", json={
                 "model": model_name,
                 "prompt": prompt,
-                "stream": False
-            }, timeout=300)  # Increased timeout to 5 minutes for slow models
+                "stream": False,
+                "keep_alive": self.keep_alive
+            })
             
             if response.status_code == 200:
-                data = response.json()
+                data = loads(response.content)
                 model_response = data.get("response", "No response generated")
                 
-                # Clean up the response (remove think tags if present)
+                # Clean up the response (remove a leading think block if present)
                 if "<think>" in model_response:
-                    # Extract text after </think>
-                    parts = model_response.split("</think>")
-                    if len(parts) > 1:
-                        model_response = parts[1].strip()
-                    else:
-                        # If no closing tag, remove everything before the first actual response
-                        model_response = model_response.replace("<think>", "").strip()
+                    model_response = strip_think(model_response, count=1)
                 
+                if cache_response:
+                    self.response_cache.set(model_name, prompt, model_response)
                 return model_response
             else:
                 return f"Error: Failed to generate response ({response.status_code})"
                 
-        except requests.exceptions.Timeout:
+        except httpx.TimeoutException:
             return "Error: Request timed out - model generation took too long"
         except Exception as e:
             logger.error(f"Error testing generation: {e}")
             return f"Error: {str(e)}"
     
-    def generate_evaluation(self, model_name: str, prompt: str) -> str:
-        """Generate evaluation response with extended timeout for complex tasks"""
+    def cache_generation(self, model_name: str, prompt: str, response: str):
+        """Store a test_generation response that the caller has accepted"""
+        self.response_cache.set(model_name, prompt, response)
+    
+    async def generate_stream(self, model_name: str, prompt: str) -> AsyncIterator[str]:
+        """
+        Yield response text from Ollama as it is generated.
+        Failures are yielded as a final "Error: ..." chunk, matching the non-streaming methods.
+        """
         try:
-            if not self.is_ollama_running():
+            if not await asyncio.to_thread(self.is_ollama_running):
+                yield "Error: Ollama is not running"
+                return
+            
+            async with self.client.stream("POST", "/api/generate", json={
+                "model": model_name,
+                "prompt": prompt,
+                "stream": True,
+                "keep_alive": self.keep_alive
+            }) as response:
+                if response.status_code != 200:
+                    yield f"Error: Failed to generate response ({response.status_code})"
+                    return
+                # Ollama streams one JSON object per line
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = loads(line)
+                    if chunk.get("response"):
+                        yield chunk["response"]
+                    if chunk.get("done"):
+                        break
+                        
+        except httpx.TimeoutException:
+            yield "Error: Request timed out - model generation took too long"
+        except Exception as e:
+            logger.error(f"Error in streaming generation: {e}")
+            yield f"Error: {str(e)}"
+    
+    async def generate_evaluation(self, model_name: str, prompt: str, num_predict: int = 2048,
+                                  response_format: Optional[Union[str, Dict[str, Any]]] = None,
+                                  cache_response: bool = True) -> str:
+        """
+        Generate evaluation response with extended timeout for complex tasks.
+        Pass response_format="json", or a JSON schema dict, to have Ollama constrain decoding.
+        Pass cache_response=False when the caller validates the response first; it can then
+        store an accepted response with cache_evaluation().
+        """
+        try:
+            cache_prompt = self._evaluation_cache_prompt(prompt, num_predict, response_format)
+            cached = self.response_cache.get(model_name, cache_prompt)
+            if cached is not None:
+                return cached
+            
+            if not await asyncio.to_thread(self.is_ollama_running):
                 return "Error: Ollama is not running"
             
             logger.info(f"Starting evaluation generation with model: {model_name}")
             
-            response = requests.post(f"{self.base_url}/api/generate", json={
+            payload = {
                 "model": model_name,
                 "prompt": prompt,
                 "stream": False,
+                "keep_alive": self.keep_alive,
                 "options": {
                     "temperature": 0.1,  # Lower temperature for more consistent evaluation
                     "top_p": 0.9,
-                    "num_predict": 2048  # Limit response length
+                    "num_predict": num_predict  # Limit response length
                 }
-            }, timeout=300)  # 5 minutes timeout for evaluation tasks
+            }
+            if response_format:
+                payload["format"] = response_format
+            
+            response = await self.client.post("/api/generate", json=payload)
             
             if response.status_code == 200:
-                data = response.json()
+                data = loads(response.content)
                 model_response = data.get("response", "No response generated")
                 
                 logger.info(f"Evaluation generation completed successfully")
+                if cache_response:
+                    self.response_cache.set(model_name, cache_prompt, model_response)
                 return model_response
             else:
                 error_msg = f"Error: Failed to generate evaluation response ({response.status_code})"
                 logger.error(error_msg)
                 return error_msg
                 
-        except requests.exceptions.Timeout:
+        except httpx.TimeoutException:
             error_msg = "Error: Request timed out - evaluation generation took too long"
             logger.error(error_msg)
             return error_msg
@@ -214,6 +381,16 @@ class OllamaService:
             logger.error(f"Error in evaluation generation: {e}")
             return error_msg
     
+    def cache_evaluation(self, model_name: str, prompt: str, response: str, num_predict: int = 2048,
+                         response_format: Optional[Union[str, Dict[str, Any]]] = None):
+        """Store a generate_evaluation response that the caller has accepted"""
+        self.response_cache.set(model_name, self._evaluation_cache_prompt(prompt, num_predict, response_format), response)
+    
+    def _evaluation_cache_prompt(self, prompt: str, num_predict: int,
+                                 response_format: Optional[Union[str, Dict[str, Any]]]) -> str:
+        """Cache key text for generate_evaluation; length limit and output format change the response"""
+        return f"{prompt}\0{num_predict}\0{dumps(response_format)}"
+    
     def get_system_info(self) -> Dict[str, Any]:
         """Get system information including CPU and GPU (with caching)"""
         current_time = time.time()
@@ -223,11 +400,10 @@ class OllamaService:
             return self._system_info_cache
         
         try:
-            # CPU information (faster measurement)
+            # CPU information (usage since the previous call, no blocking sample)
             cpu_info = {
-                "count": psutil.cpu_count(),
-                "percent": psutil.cpu_percent(interval=0.1),  # Reduced from 1 second to 0.1 seconds
-                "frequency": psutil.cpu_freq()._asdict() if psutil.cpu_freq() else None
+                **self._static_cpu_info,
+                "percent": psutil.cpu_percent(interval=None)
             }
             
             # Memory information
@@ -264,91 +440,73 @@ class OllamaService:
                 "ollama_running": False
             }
     
-    def _get_gpu_info_fast(self) -> Dict[str, Any]:
-        """Get GPU information (optimized for speed)"""
-        try:
-            # Quick check for CUDA availability
+    def _get_gpu_static(self) -> Dict[str, Any]:
+        """Device names and total memory, looked up once per process"""
+        if self._gpu_static is None:
             try:
                 import torch
                 if torch.cuda.is_available():
-                    return {
+                    self._gpu_static = {
                         "available": True,
-                        "count": torch.cuda.device_count(),
                         "gpus": [
                             {
                                 "name": torch.cuda.get_device_name(i),
-                                "memory_total": torch.cuda.get_device_properties(i).total_memory,
-                                "memory_used": torch.cuda.memory_allocated(i),
-                                "memory_free": torch.cuda.memory_reserved(i),
-                                "utilization": 0
+                                "memory_total": torch.cuda.get_device_properties(i).total_memory
                             }
                             for i in range(torch.cuda.device_count())
                         ]
                     }
                 else:
-                    return {"available": False, "count": 0, "gpus": []}
+                    self._gpu_static = {"available": False, "gpus": []}
             except ImportError:
-                return {"available": False, "count": 0, "gpus": [], "error": "torch not available"}
-                    
-        except Exception as e:
-            return {"available": False, "count": 0, "gpus": [], "error": str(e)}
+                self._gpu_static = {"available": False, "gpus": [], "error": "torch not available"}
+        return self._gpu_static
     
-    def _get_gpu_info(self) -> Dict[str, Any]:
-        """Get GPU information (full version with nvidia-ml-py)"""
+    def _get_gpu_info_fast(self) -> Dict[str, Any]:
+        """Get GPU information (optimized for speed)"""
         try:
-            # Try to use nvidia-ml-py if available
-            try:
-                import pynvml
-                pynvml.nvmlInit()
-                gpu_count = pynvml.nvmlDeviceGetCount()
-                
-                gpus = []
-                for i in range(gpu_count):
-                    handle = pynvml.nvmlDeviceGetHandleByIndex(i)
-                    name = pynvml.nvmlDeviceGetName(handle).decode('utf-8')
-                    memory = pynvml.nvmlDeviceGetMemoryInfo(handle)
-                    utilization = pynvml.nvmlDeviceGetUtilizationRates(handle)
-                    
-                    gpus.append({
-                        "name": name,
-                        "memory_total": memory.total,
-                        "memory_used": memory.used,
-                        "memory_free": memory.free,
-                        "utilization": utilization.gpu
-                    })
-                
-                pynvml.nvmlShutdown()
-                return {"available": True, "count": gpu_count, "gpus": gpus}
-                
-            except ImportError:
-                # Fallback: check if CUDA is available via torch
-                try:
-                    import torch
-                    if torch.cuda.is_available():
-                        return {
-                            "available": True,
-                            "count": torch.cuda.device_count(),
-                            "gpus": [
-                                {
-                                    "name": torch.cuda.get_device_name(i),
-                                    "memory_total": torch.cuda.get_device_properties(i).total_memory,
-                                    "memory_used": torch.cuda.memory_allocated(i),
-                                    "memory_free": torch.cuda.memory_reserved(i),
-                                    "utilization": 0  # Not available without nvidia-ml-py
-                                }
-                                for i in range(torch.cuda.device_count())
-                            ]
-                        }
-                    else:
-                        return {"available": False, "count": 0, "gpus": []}
-                except ImportError:
-                    return {"available": False, "count": 0, "gpus": [], "error": "torch not available"}
+            static = self._get_gpu_static()
+            if not static["available"]:
+                return {"count": 0, **static}
+            
+            import torch
+            return {
+                "available": True,
+                "count": len(static["gpus"]),
+                "gpus": [
+                    {
+                        **gpu,
+                        "memory_used": torch.cuda.memory_allocated(i),
+                        "memory_free": torch.cuda.memory_reserved(i),
+                        "utilization": 0
+                    }
+                    for i, gpu in enumerate(static["gpus"])
+                ]
+            }
                     
         except Exception as e:
             return {"available": False, "count": 0, "gpus": [], "error": str(e)}
     
     def get_model_status(self) -> Dict[str, Any]:
-        """Get comprehensive model and system status (optimized)"""
+        """Get comprehensive model and system status (optimized, briefly cached)"""
+        current_time = time.monotonic()
+        if (current_time - self._status_cache_timestamp) < self._status_cache_duration and self._status_cache:
+            return self._status_cache
+        
+        self._status_cache = self._build_model_status()
+        self._status_cache_timestamp = time.monotonic()
+        return self._status_cache
+    
+    def _invalidate_model_status(self):
+        """Drop the cached model status after the current model changes"""
+        self._status_cache = {}
+    
+    def invalidate_models_cache(self):
+        """Drop the cached model list so the next call re-reads /api/tags"""
+        self._models_cache = None
+        self._invalidate_model_status()
+    
+    def _build_model_status(self) -> Dict[str, Any]:
         try:
             # Get all data in parallel where possible
             ollama_running = self.is_ollama_running()
@@ -1,9 +1,11 @@
 import logging
 import asyncio
-from typing import Dict, Any, List, Optional
-from datetime import datetime
+import time
+from typing import Dict, Any, List, Optional, Tuple
 import json
 import uuid
+from collections import OrderedDict
+from ..config import settings
 from .ollama_service import ollama_service
 from .evaluation_agent import evaluation_agent
 from .analysis_agent import analysis_agent
@@ -17,7 +19,8 @@ class ProcessingPipeline:
     
     def __init__(self):
         self.current_model = None
-        self.results_cache = {}
+        self.results_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._results_cache_size = settings.RESULTS_CACHE_SIZE
     
     async def process_chat_log(self, transcript: List[Dict[str, str]], chat_log_id: str) -> Dict[str, Any]:
         """
@@ -33,17 +36,18 @@ class ProcessingPipeline:
         results = {
             "chat_log_id": chat_log_id,
             "processing_id": str(uuid.uuid4()),
-            "start_time": datetime.utcnow().isoformat(),
+            "start_time": time.time(),
             "agents": {},
             "overall_status": "processing",
             "error_messages": {},
         }
-        self.results_cache[chat_log_id] = results
+        # Status readers see this dict as it fills in, so no per-stage snapshots are needed
+        self._store_results(chat_log_id, results)
         try:
             logger.info(f"Starting processing pipeline for chat_log_id: {chat_log_id}")
             
             # Check if Ollama is running
-            if not ollama_service.is_ollama_running():
+            if not await asyncio.to_thread(ollama_service.is_ollama_running):
                 error_msg = "Ollama is not running"
                 logger.error(error_msg)
                 results["overall_status"] = "failed"
@@ -51,7 +55,7 @@ class ProcessingPipeline:
                 return results
             
             # Get available models
-            available_models = ollama_service.get_available_models()
+            available_models = await asyncio.to_thread(ollama_service.get_available_models)
             if not available_models:
                 error_msg = "No models available in Ollama"
                 logger.error(error_msg)
@@ -60,15 +64,24 @@ class ProcessingPipeline:
                 return results
             model_names = [model.get("name", "") for model in available_models]
 
-            # EVALUATION AGENT
+            # EVALUATION AND ANALYSIS AGENTS
             eval_default_model = ollama_service.get_default_model()
             eval_model_name = eval_default_model if eval_default_model in model_names else available_models[0]["name"]
+            analysis_default_model = ollama_service.get_agent_default_model("analysis")
+            analysis_model_name = analysis_default_model if analysis_default_model in model_names else available_models[0]["name"]
             logger.info(f"Using evaluation model: {eval_model_name}")
-            ollama_service.load_model(eval_model_name)
-            logger.info(f"Model loaded for evaluation: {eval_model_name}")
-            evaluation_result = await evaluation_agent.evaluate_chat(transcript, eval_model_name)
-            ollama_service.unload_model()
-            logger.info(f"Model unloaded after evaluation: {eval_model_name}")
+            logger.info(f"Using analysis model: {analysis_model_name}")
+            await asyncio.to_thread(ollama_service.load_model, eval_model_name)
+            # Neither agent needs the other's output, so both requests are in flight at once;
+            # Ollama serves them side by side up to OLLAMA_NUM_PARALLEL / OLLAMA_MAX_LOADED_MODELS
+            evaluation_result, analysis_result = await asyncio.gather(
+                evaluation_agent.evaluate_chat(transcript, eval_model_name),
+                self._run_analysis_agent(transcript, analysis_model_name),
+                return_exceptions=True
+            )
+            
+            if isinstance(evaluation_result, Exception):
+                evaluation_result = {"error_message": f"Evaluation agent error: {str(evaluation_result)}", "result": None}
             if evaluation_result.get("error_message"):
                 results["agents"]["evaluation"] = {
                     "status": "failed",
@@ -81,16 +94,17 @@ class ProcessingPipeline:
                     "status": "completed",
                     "result": evaluation_result["result"] if "result" in evaluation_result else evaluation_result
                 }
-            self.results_cache[chat_log_id] = results.copy()
-
-            # ANALYSIS AGENT
-            analysis_default_model = ollama_service.get_agent_default_model("analysis")
-            analysis_model_name = analysis_default_model if analysis_default_model in model_names else available_models[0]["name"]
-            logger.info(f"Using analysis model: {analysis_model_name}")
-            ollama_service.load_model(analysis_model_name)
-            logger.info(f"Model loaded for analysis: {analysis_model_name}")
-            try:
-                analysis_result = await self._run_analysis_agent(transcript, analysis_model_name)
+            
+            if isinstance(analysis_result, Exception):
+                error_msg = f"Analysis agent error: {str(analysis_result)}"
+                logger.error(error_msg)
+                results["agents"]["analysis"] = {
+                    "status": "failed",
+                    "error_message": error_msg
+                }
+                results["error_messages"]["analysis"] = error_msg
+                analysis_result = None
+            else:
                 if analysis_result is None:
                     analysis_result = {
                         "key_issues": [],
@@ -105,25 +119,16 @@ class ProcessingPipeline:
                     "status": "completed",
                     "result": analysis_result
                 }
-                self.results_cache[chat_log_id] = results.copy()
-            except Exception as e:
-                error_msg = f"Analysis agent error: {str(e)}"
-                logger.error(error_msg)
-                results["agents"]["analysis"] = {
-                    "status": "failed",
-                    "error_message": error_msg
-                }
-                results["error_messages"]["analysis"] = error_msg
-                self.results_cache[chat_log_id] = results.copy()
-            ollama_service.unload_model()
-            logger.info(f"Model unloaded after analysis: {analysis_model_name}")
+            logger.info(f"Evaluation and analysis finished with models: {eval_model_name}, {analysis_model_name}")
 
             # RECOMMENDATION AGENT
             recommendation_default_model = ollama_service.get_agent_default_model("recommendation")
             recommendation_model_name = recommendation_default_model if recommendation_default_model in model_names else available_models[0]["name"]
             logger.info(f"Using recommendation model: {recommendation_model_name}")
-            ollama_service.load_model(recommendation_model_name)
-            logger.info(f"Model loaded for recommendation: {recommendation_model_name}")
+            # Ollama keeps models resident for OLLAMA_KEEP_ALIVE, so only switch when the stage needs another model
+            if recommendation_model_name != eval_model_name:
+                await asyncio.to_thread(ollama_service.load_model, recommendation_model_name)
+                logger.info(f"Model loaded for recommendation: {recommendation_model_name}")
             try:
                 evaluation_summary = evaluation_result["result"].get("evaluation_summary") if evaluation_result.get("result") else ""
                 analysis_summary = analysis_result.get("analysis_summary") if analysis_result else ""
@@ -151,7 +156,6 @@ class ProcessingPipeline:
                     "status": "completed",
                     "result": recommendation_result
                 }
-                self.results_cache[chat_log_id] = results.copy()
             except Exception as e:
                 error_msg = f"Recommendation agent error: {str(e)}"
                 logger.error(error_msg)
@@ -160,9 +164,6 @@ class ProcessingPipeline:
                     "error_message": error_msg
                 }
                 results["error_messages"]["recommendation"] = error_msg
-                self.results_cache[chat_log_id] = results.copy()
-            ollama_service.unload_model()
-            logger.info(f"Model unloaded after recommendation: {recommendation_model_name}")
 
             # Determine overall status
             failed_agents = [agent for agent, data in results["agents"].items() if data["status"] == "failed"]
@@ -174,14 +175,13 @@ class ProcessingPipeline:
             else:
                 results["overall_status"] = "completed"
             
-            results["end_time"] = datetime.utcnow().isoformat()
-            self.results_cache[chat_log_id] = results.copy()
+            results["end_time"] = time.time()
             logger.info(f"Processing pipeline completed with status: {results['overall_status']}")
             
-            # Final safety: unload model at the end
+            # Unload once at the end rather than between stages
             try:
-                logger.info(f"Final auto-unloading model {analysis_model_name} after processing completion")
-                ollama_service.unload_model()
+                logger.info(f"Auto-unloading model {recommendation_model_name} after processing completion")
+                await asyncio.to_thread(ollama_service.unload_model)
             except Exception as e:
                 logger.warning(f"Failed to auto-unload model after processing: {e}")
             return results
@@ -190,9 +190,37 @@ class ProcessingPipeline:
             logger.error(f"Error in processing pipeline: {e}")
             results["overall_status"] = "failed"
             results["error_messages"]["pipeline"] = str(e)
-            self.results_cache[chat_log_id] = results.copy()
             return results
     
+    async def process_chat_logs(self, items: List[Tuple[List[Dict[str, str]], str]], max_concurrency: int = 4) -> List[Any]:
+        """
+        Process several chat logs with at most max_concurrency pipelines in flight.
+        
+        Args:
+            items: List of (transcript, chat_log_id) pairs
+            max_concurrency: Maximum number of pipelines running at once; keep in line with OLLAMA_NUM_PARALLEL
+            
+        Returns:
+            List of pipeline results in the order of items; a pipeline that raised yields its exception
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def _process_one(transcript: List[Dict[str, str]], chat_log_id: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.process_chat_log(transcript, chat_log_id)
+
+        return await asyncio.gather(
+            *(_process_one(transcript, chat_log_id) for transcript, chat_log_id in items),
+            return_exceptions=True
+        )
+    
+    def _store_results(self, chat_log_id: str, results: Dict[str, Any]):
+        """Track a run's results, evicting the least recently started runs beyond RESULTS_CACHE_SIZE."""
+        self.results_cache[chat_log_id] = results
+        self.results_cache.move_to_end(chat_log_id)
+        while len(self.results_cache) > max(1, self._results_cache_size):
+            self.results_cache.popitem(last=False)
+    
     async def _run_analysis_agent(self, transcript: List[Dict[str, str]], model_name: str) -> Dict[str, Any]:
         """Run the analysis agent with structured output and fallback."""
         guidelines = None  # Or pass a list to override
@@ -216,7 +244,7 @@ class ProcessingPipeline:
         Please provide actionable recommendations.
         """
         
-        response = ollama_service.generate_evaluation(model_name, recommendation_prompt)
+        response = await ollama_service.generate_evaluation(model_name, recommendation_prompt)
         
         if response.startswith("Error"):
             raise Exception(response)
@@ -229,17 +257,12 @@ class ProcessingPipeline:
     
     def _format_transcript(self, transcript: List[Dict[str, str]]) -> str:
         """Format transcript for analysis."""
-        formatted = []
-        for message in transcript:
-            sender = message.get("sender", "Unknown")
-            text = message.get("text", "")
-            timestamp = message.get("timestamp", "")
-            
-            if timestamp:
-                formatted.append(f"[{timestamp}] {sender}: {text}")
-            else:
-                formatted.append(f"{sender}: {text}")
-        return "\n".join(formatted)
+        return "\n".join([
+            f"[{m['timestamp']}] {m.get('sender', 'Unknown')}: {m.get('text', '')}"
+            if m.get("timestamp") else
+            f"{m.get('sender', 'Unknown')}: {m.get('text', '')}"
+            for m in transcript
+        ])
     
     async def get_processing_status(self, chat_log_id: str) -> Dict[str, Any]:
         """
@@ -1,12 +1,26 @@
+import asyncio
 import logging
 from typing import Dict, Any, List
 from app.services.ollama_service import ollama_service
+from app.services.json_extract import find_outer_json, loads
 import re
 import random
 import json
 
 logger = logging.getLogger(__name__)
 
+# Speaker tokens used in recommendation prompts; other senders are written as "sender:"
+_SPEAKER_TOKENS = {"agent": "<|AGENT|>", "customer": "<|CUSTOMER|>"}
+
+# Flexible regex: match optional bullets/numbers/dashes, all 'Original'/'Suggested' variants, and tolerate whitespace
+_FEEDBACK_PAIR_RE = re.compile(
+    r"(?:^|\n)[\-\d\.\s]*Original(?: message)?\s*:\s*(.*?)\n[\-\d\.\s]*Suggested(?: (?:improvement|message))?\s*:\s*(.*?)(?=\n[\-\d\.\s]*Original(?: message)?\s*:|\n*$)",
+    re.DOTALL | re.IGNORECASE
+)
+# Splits feedback into one chunk per "Original message:" when the pair regex finds nothing
+_ORIGINAL_SPLIT_RE = re.compile(r'[\-\d\.\s]*Original(?: message)?\s*:')
+_COACHING_RE = re.compile(r"Long-term Coaching:\s*(.*)", re.DOTALL | re.IGNORECASE)
+
 class RecommendationAgent:
     """
     Recommendation agent that uses transcript, evaluation summary, and analysis summary to generate actionable feedback.
@@ -16,31 +30,25 @@ class RecommendationAgent:
         self.name = "recommendation_agent"
     
     def _format_transcript_with_tokens(self, transcript: List[Dict[str, str]]) -> str:
-        formatted = []
+        lines = []
         for message in transcript:
             sender = message.get("sender", "Unknown").lower()
-            text = message.get("text", "")
-            if sender == "agent":
-                formatted.append(f"<|AGENT|> {text}")
-            elif sender == "customer":
-                formatted.append(f"<|CUSTOMER|> {text}")
-            else:
-                formatted.append(f"{sender}: {text}")
-        return "\n".join(formatted)
+            lines.append(f"{_SPEAKER_TOKENS.get(sender, sender + ':')} {message.get('text', '')}")
+        return "\n".join(lines)
 
     async def generate_recommendations(self, transcript: List[Dict[str, str]], evaluation_summary: str, analysis_summary: str, model_name: str = None) -> Dict[str, Any]:
         """
         Generate recommendations using a dual-prompt approach: one for specific feedback, one for long-term coaching.
         """
         try:
-            if not ollama_service.is_ollama_running():
+            if not await asyncio.to_thread(ollama_service.is_ollama_running):
                 return {
                     "error_message": "Ollama is not running",
                     "specific_feedback": [],
                     "long_term_coaching": None,
                     "raw_output": ""
                 }
-            available_models = ollama_service.get_available_models()
+            available_models = await asyncio.to_thread(ollama_service.get_available_models)
             if not available_models:
                 return {
                     "error_message": "No models available in Ollama",
@@ -75,37 +83,34 @@ class RecommendationAgent:
                 "EXAMPLE OUTPUT:\n"
                 "Long-term Coaching: The agent should focus on active listening, empathy, and clear communication. Training in de-escalation techniques and maintaining professionalism, even under stress, will improve customer satisfaction and outcomes.\n"
             )
-            logger.info(f"[RECOMMENDATION] Feedback prompt sent to model {selected_model}:\n{feedback_prompt}")
-            feedback_response = ollama_service.test_generation(selected_model, feedback_prompt)
-            logger.info(f"[RECOMMENDATION] Coaching prompt sent to model {selected_model}:\n{coaching_prompt}")
-            coaching_response = ollama_service.test_generation(selected_model, coaching_prompt)
-            logger.info(f"[RECOMMENDATION] Raw feedback response: {feedback_response}")
-            logger.info(f"[RECOMMENDATION] Raw coaching response: {coaching_response}")
+            logger.debug("[RECOMMENDATION] Feedback prompt sent to model %s:\n%s", selected_model, feedback_prompt)
+            feedback_response = await ollama_service.test_generation(selected_model, feedback_prompt)
+            logger.debug("[RECOMMENDATION] Coaching prompt sent to model %s:\n%s", selected_model, coaching_prompt)
+            coaching_response = await ollama_service.test_generation(selected_model, coaching_prompt)
+            logger.debug("[RECOMMENDATION] Raw feedback response: %s", feedback_response)
+            logger.debug("[RECOMMENDATION] Raw coaching response: %s", coaching_response)
             # --- Parse feedback pairs ---
             feedback = []
             try:
                 # Try to parse as JSON first (in case feedback_response is a JSON string)
                 feedback_text = feedback_response
-                try:
-                    feedback_json = json.loads(feedback_response)
-                    if isinstance(feedback_json, dict) and "feedback" in feedback_json:
-                        feedback_text = feedback_json["feedback"]
-                except Exception:
-                    feedback_text = feedback_response
+                # Plain-text pairs are the usual output; a JSON object may also arrive wrapped in prose or fences
+                json_str = find_outer_json(feedback_response)
+                if json_str is not None:
+                    try:
+                        feedback_json = loads(json_str)
+                        if isinstance(feedback_json, dict) and "feedback" in feedback_json:
+                            feedback_text = feedback_json["feedback"]
+                    except json.JSONDecodeError:
+                        pass  # A brace span that is not JSON; read the text as plain pairs
 
-                # Flexible regex: match optional bullets/numbers/dashes, all 'Original'/'Suggested' variants, and tolerate whitespace
-                pattern = re.compile(
-                    r"(?:^|\n)[\-\d\.\s]*Original(?: message)?\s*:\s*(.*?)\n[\-\d\.\s]*Suggested(?: (?:improvement|message))?\s*:\s*(.*?)(?=\n[\-\d\.\s]*Original(?: message)?\s*:|\n*$)",
-                    re.DOTALL | re.IGNORECASE
-                )
-                matches = pattern.findall(feedback_text)
+                matches = _FEEDBACK_PAIR_RE.findall(feedback_text)
                 for orig, sugg in matches:
                     if orig.strip() and sugg.strip():
                         feedback.append({"original_text": orig.strip(), "suggested_text": sugg.strip()})
                 # Fallback: try to parse at least one pair if the above fails
                 if not feedback:
-                    import re as _re
-                    parts = _re.split(r'[\-\d\.\s]*Original(?: message)?\s*:', feedback_text)
+                    parts = _ORIGINAL_SPLIT_RE.split(feedback_text)
                     for part in parts[1:]:
                         if 'Suggested message:' in part:
                             orig, sugg = part.split('Suggested message:', 1)
@@ -124,7 +129,7 @@ class RecommendationAgent:
             # --- Parse coaching paragraph ---
             coaching = None
             try:
-                match = re.search(r"Long-term Coaching:\s*(.*)", coaching_response, re.DOTALL | re.IGNORECASE)
+                match = _COACHING_RE.search(coaching_response)
                 if match:
                     coaching = match.group(1).strip()
                 else:
@@ -161,7 +166,6 @@ recommendation_agent = RecommendationAgent()
 
 # Sample for testing
 if __name__ == "__main__":
-    import asyncio
     transcript = [
         {"sender": "customer", "text": "Hi! I'm calling about a really frustrating experience I had last week with one of your support agents. Honestly, I love your product, it's been a lifesaver, but the agent I spoke with was… not great. They were dismissive and didn't really try to help. I'm hoping we can get this sorted out."},
         {"sender": "agent", "text": "Oh, joy. Another complaint about 'feelings.' Look, we handle thousands of calls. Sometimes people have bad days. What exactly did this agent *do* that was so earth-shattering?"},
@@ -0,0 +1,47 @@
+import hashlib
+import logging
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+class ResponseCache:
+    """
+    On-disk cache of model responses keyed by (model, prompt).
+    Intended for development runs that replay the same transcripts; it stays
+    disabled unless AURIS_LLM_CACHE=1 is set.
+    """
+
+    def __init__(self, cache_dir: str, enabled: bool = False):
+        self.cache_dir = Path(cache_dir)
+        self.enabled = enabled
+
+    def _path(self, model_name: str, prompt: str) -> Path:
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(model_name.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(prompt.encode("utf-8"))
+        return self.cache_dir / f"{digest.hexdigest()}.txt"
+
+    def get(self, model_name: str, prompt: str) -> Optional[str]:
+        """Return the cached response, or None on a miss or when caching is disabled"""
+        if not self.enabled:
+            return None
+        try:
+            return self._path(model_name, prompt).read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"Failed to read cached response: {e}")
+            return None
+
+    def set(self, model_name: str, prompt: str, response: str):
+        """Store a response; failures are logged and otherwise ignored"""
+        if not self.enabled:
+            return
+        try:
+            path = self._path(model_name, prompt)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(response, encoding="utf-8")
+        except OSError as e:
+            logger.warning(f"Failed to write cached response: {e}")